@@ -0,0 +1,131 @@
+import argparse
+import multiprocessing
+import os
+
+from crossword import *
+from generate import CrosswordCreator
+
+# Search nodes each attempt may visit before giving up
+MAX_NODES = 100000
+
+# Vocabulary shared by every attempt made in this process
+vocabulary = None
+
+
+def load(words):
+    """
+    Set the vocabulary used by this process's attempts.
+    """
+    global vocabulary
+    vocabulary = words
+
+
+def attempt(structure_file, seed, max_nodes=MAX_NODES):
+    """
+    Solve `structure_file` once, breaking value-ordering ties with `seed`
+    and visiting at most `max_nodes` search nodes.
+    Return (structure_file, seed, assignment), where assignment is None
+    if no solution was found.
+    """
+    creator = CrosswordCreator(
+        Crossword(structure_file, vocabulary), seed=seed, max_nodes=max_nodes
+    )
+    return structure_file, seed, creator.solve()
+
+
+def run(task):
+    """
+    Make the attempt described by a (structure_file, seed, max_nodes) task.
+    """
+    return attempt(*task)
+
+
+def generate(structures, words, count=1, attempts=1, workers=None,
+             max_nodes=MAX_NODES):
+    """
+    Solve each of the `structures` files `attempts` times with randomized
+    value ordering, each attempt visiting at most `max_nodes` search
+    nodes, spread over a pool of `workers` processes that each receive
+    the already indexed vocabulary `words` once.
+
+    Return a list of up to `count` distinct (structure_file, seed,
+    assignment) solutions, in the order they were found. Attempts still
+    running once `count` solutions are found are stopped.
+    """
+    solutions = []
+    seen = set()
+    tasks = [
+        (structure, seed, max_nodes)
+        for structure in structures
+        for seed in range(attempts)
+    ]
+
+    # Leaving the block terminates the workers, stopping running attempts
+    with multiprocessing.Pool(
+        workers, initializer=load, initargs=(words,)
+    ) as pool:
+        for structure, seed, assignment in pool.imap_unordered(run, tasks):
+            if assignment is None:
+                continue
+            key = (structure, frozenset(assignment.items()))
+            if key in seen:
+                continue
+            seen.add(key)
+            solutions.append((structure, seed, assignment))
+            if len(solutions) == count:
+                break
+    return solutions
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description="Generate many crosswords from one word list."
+    )
+    parser.add_argument("words")
+    parser.add_argument("structures", nargs="+")
+    parser.add_argument("-n", "--count", type=int, default=1,
+                        help="number of solutions to return")
+    parser.add_argument("-a", "--attempts", type=int, default=1,
+                        help="random restarts per structure")
+    parser.add_argument("-m", "--max-nodes", type=int, default=MAX_NODES,
+                        help="search nodes each attempt may visit")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of worker processes")
+    parser.add_argument("-o", "--output", default=None,
+                        help="directory to save images to")
+    args = parser.parse_args()
+
+    # Generate crosswords
+    words = Vocabulary(args.words)
+    solutions = generate(
+        args.structures, words,
+        count=args.count, attempts=args.attempts, workers=args.workers,
+        max_nodes=args.max_nodes
+    )
+
+    # Print results
+    if not solutions:
+        print("No solution.")
+    grids = []
+    for structure, seed, assignment in solutions:
+        creator = CrosswordCreator(Crossword(structure, words))
+        print(f"{structure} (seed {seed}):")
+        creator.print(assignment)
+        print()
+        grids.append(
+            (creator.crossword.structure, creator.letter_grid(assignment))
+        )
+
+    # Save images
+    if args.output:
+        from render import save_all
+        os.makedirs(args.output, exist_ok=True)
+        save_all(grids, [
+            os.path.join(args.output, f"{k}.png") for k in range(len(grids))
+        ], workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
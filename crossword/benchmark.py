@@ -0,0 +1,161 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import signal
+import tempfile
+import time
+
+from crossword import *
+from generate import CrosswordCreator
+
+STRATEGIES = [CrosswordCreator.BACKTRACK, CrosswordCreator.MAC]
+
+# Bundled (structure, words) pairs
+BUNDLED = [
+    (f"data/structure{k}.txt", f"data/words{k}.txt") for k in range(3)
+]
+
+
+def synthetic_structure(height, width, density, seed):
+    """
+    Return the lines of a random `height` by `width` structure in which
+    each cell is open with probability `density`.
+    """
+    rng = random.Random(seed)
+    return [
+        "".join("_" if rng.random() < density else "#" for _ in range(width))
+        for _ in range(height)
+    ]
+
+
+class Stopped(Exception):
+    """
+    Raised in a solving process when the benchmark stops it.
+    """
+
+
+def stop(signum, frame):
+    raise Stopped
+
+
+def run(structure_file, words_file, strategy, trace, results):
+    """
+    Solve one crossword with `strategy`, putting the outcome and search
+    statistics on the `results` queue. If the process is terminated
+    first, put the statistics gathered so far instead.
+    """
+    signal.signal(signal.SIGTERM, stop)
+    crossword = creator = None
+    try:
+        crossword = Crossword(structure_file, words_file)
+        creator = CrosswordCreator(crossword, strategy=strategy, trace=trace)
+        assignment = creator.solve()
+    except Stopped:
+        results.put({
+            "solved": None,
+            "timeout": True,
+            "variables": len(crossword.variables) if crossword else None,
+            "stats": creator.stats if creator else None
+        })
+        return
+    results.put({
+        "solved": assignment is not None,
+        "variables": len(crossword.variables),
+        "stats": creator.stats
+    })
+
+
+def benchmark(cases, strategies=STRATEGIES, timeout=60, trace=False):
+    """
+    Solve each (structure, words) pair in `cases` with each strategy, in a
+    separate process that is stopped after `timeout` seconds, recording
+    the total domain size at every search node if `trace` is True.
+    Return a list with one result per case and strategy.
+    """
+    results = []
+    for structure_file, words_file in cases:
+        for strategy in strategies:
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=run,
+                args=(structure_file, words_file, strategy, trace, queue)
+            )
+            start = time.perf_counter()
+            process.start()
+            try:
+                result = queue.get(timeout=timeout)
+            except Exception:
+
+                # Stop the solve, and collect its statistics so far
+                process.terminate()
+                try:
+                    result = queue.get(timeout=5)
+                except Exception:
+                    result = {"solved": None, "timeout": True}
+            process.join(1)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            result.update({
+                "structure": structure_file,
+                "words": words_file,
+                "strategy": strategy,
+                "seconds": time.perf_counter() - start
+            })
+            results.append(result)
+            print(
+                f"{structure_file} {strategy}: "
+                f"{'timeout' if result.get('timeout') else result['solved']} "
+                f"in {result['seconds']:.3f}s"
+            )
+    return results
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description="Compare crossword search strategies."
+    )
+    parser.add_argument("-s", "--synthetic", type=int, default=3,
+                        help="number of synthetic grids")
+    parser.add_argument("--size", type=int, default=9,
+                        help="height and width of synthetic grids")
+    parser.add_argument("--density", type=float, default=0.6,
+                        help="fraction of open cells in synthetic grids")
+    parser.add_argument("--words", default="data/words2.txt",
+                        help="word list for synthetic grids")
+    parser.add_argument("-t", "--timeout", type=float, default=60,
+                        help="seconds allowed per solve")
+    parser.add_argument("--trace", action="store_true",
+                        help="record the total domain size at every node")
+    parser.add_argument("-o", "--output", default=None,
+                        help="file to write JSON results to")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        # Write synthetic grids alongside the bundled ones
+        cases = list(BUNDLED)
+        for seed in range(args.synthetic):
+            filename = os.path.join(directory, f"synthetic{seed}.txt")
+            with open(filename, "w") as f:
+                f.write("\n".join(synthetic_structure(
+                    args.size, args.size, args.density, seed
+                )))
+            cases.append((filename, args.words))
+
+        results = benchmark(cases, timeout=args.timeout, trace=args.trace)
+
+    contents = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(contents)
+    else:
+        print(contents)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,20 @@
+def bitmask(indices, size):
+    """Return an integer with the bits at each of `indices` set."""
+    bits = bytearray((size + 7) // 8)
+    for k in indices:
+        bits[k >> 3] |= 1 << (k & 7)
+    return int.from_bytes(bits, "little")
+
+
+def bit_indices(mask):
+    """Yield the index of every set bit in `mask`, lowest first."""
+    digits = bin(mask)[:1:-1]
+    k = digits.find("1")
+    while k != -1:
+        yield k
+        k = digits.find("1", k + 1)
+
+
 class Variable():
 
     ACROSS = "across"
@@ -35,6 +52,76 @@ class Variable():
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+class Overlaps(dict):
+    """
+    Mapping from pairs of variables to their overlap that only stores
+    the pairs which actually overlap; any other pair maps to None.
+    """
+
+    def __missing__(self, key):
+        return None
+
+
+class Vocabulary():
+
+    def __init__(self, words_file):
+        """
+        Load and index a word list, so that it can be shared by
+        any number of crosswords.
+        """
+        with open(words_file) as f:
+            self.words = set(f.read().upper().splitlines())
+
+        # Index vocabulary by length: each length has its own sorted word
+        # list, and every (length, position, letter) maps to the bitmask
+        # of that list's words with that letter at that position
+        self.word_lists = dict()
+        for word in sorted(self.words):
+            self.word_lists.setdefault(len(word), []).append(word)
+        self.word_index = dict()
+        self.length_masks = dict()
+        self.letter_masks = dict()
+        for length, word_list in self.word_lists.items():
+            size = len(word_list)
+            self.length_masks[length] = (1 << size) - 1
+            for position in range(length):
+                letters = dict()
+                for index, word in enumerate(word_list):
+                    letters.setdefault(word[position], []).append(index)
+                self.letter_masks[length, position] = {
+                    letter: bitmask(indices, size)
+                    for letter, indices in letters.items()
+                }
+            for index, word in enumerate(word_list):
+                self.word_index[word] = index
+
+    def matching(self, pattern):
+        """
+        Return the bitmask of words of length `len(pattern)` that match
+        `pattern`, in which "_" matches any letter, e.g. "_A___".
+        """
+        length = len(pattern)
+        mask = self.length_masks.get(length, 0)
+        for position, letter in enumerate(pattern.upper()):
+            if letter != "_":
+                letters = self.letter_masks.get((length, position), {})
+                mask &= letters.get(letter, 0)
+        return mask
+
+    def words_in(self, length, mask):
+        """
+        Return list of words of length `length` whose bits are set in `mask`.
+        """
+        word_list = self.word_lists.get(length, [])
+        return [word_list[k] for k in bit_indices(mask)]
+
+    def words_matching(self, pattern):
+        """
+        Return list of words that match `pattern`.
+        """
+        return self.words_in(len(pattern), self.matching(pattern))
+
+
 class Crossword():
 
     def __init__(self, structure_file, words_file):
@@ -57,9 +144,12 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        # Save vocabulary list, loading it unless already indexed
+        if isinstance(words_file, Vocabulary):
+            self.vocabulary = words_file
+        else:
+            self.vocabulary = Vocabulary(words_file)
+        self.words = self.vocabulary.words
 
         # Determine variable set
         self.variables = set()
@@ -104,30 +194,31 @@ class Crossword():
                             length=length
                         ))
 
+        # Map each cell to the variables passing through it, along with
+        # the index of that cell within each variable
+        crossings = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                crossings.setdefault(cell, []).append((var, k))
+
         # Compute overlaps for each word
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # `adjacency` lists the (v2, i, j) overlaps of each variable v1
+        self.overlaps = Overlaps()
+        self.adjacency = {var: [] for var in self.variables}
+        for crossing in crossings.values():
+            for v1, i in crossing:
+                for v2, j in crossing:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (i, j)
+                        self.adjacency[v1].append((v2, i, j))
+        self._neighbors = {
+            var: frozenset(v for v, _, _ in self.adjacency[var])
+            for var in self.variables
+        }
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self._neighbors[var]
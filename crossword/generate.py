@@ -1,20 +1,80 @@
+import json
+import random
 import sys
+import time
+
+from collections import deque
 
 from crossword import *
 
 
+class Exhausted(Exception):
+    """
+    Raised when a search has visited as many nodes as it may.
+    """
+
+
 class CrosswordCreator():
 
-    def __init__(self, crossword):
+    # Search strategies: plain backtracking, or maintaining arc consistency
+    BACKTRACK = "backtrack"
+    MAC = "mac"
+
+    def __init__(self, crossword, strategy=MAC, seed=None, trace=False,
+                 max_nodes=None):
         """
         Create new CSP crossword generate.
+        If `seed` is given, ties in value ordering are broken randomly,
+        so that restarts with different seeds explore different grids.
+        If `trace` is True, the total domain size is recorded at every
+        node of the search in `self.stats`.
+        If `max_nodes` is given, the search gives up after visiting that
+        many nodes.
         """
         self.crossword = crossword
+        self.strategy = strategy
+        self.random = random.Random(seed) if seed is not None else None
+        self.max_nodes = max_nodes
+
+        # Undo trail of (variable, previous domain) for every domain change
+        self.trail = []
+
+        # Words used by the assignment currently being searched
+        self.used = set()
+
+        # Cache of (domain, letter counts) for each (variable, position)
+        self.histograms = dict()
+
+        # Search statistics
+        self.trace = trace
+        self.stats = {
+            "strategy": strategy,
+            "nodes": 0,
+            "backtracks": 0,
+            "revise_calls": 0,
+            "revisions": 0,
+            "arcs": 0,
+            "exhausted": False,
+            "seconds": dict(),
+            "domain_sizes": []
+        }
+
+        # Each domain is a bitmask over the vocabulary's words of the
+        # variable's length, starting out as the whole length bucket
+        lengths = self.crossword.vocabulary.length_masks
         self.domains = {
-            var: self.crossword.words.copy()
+            var: lengths.get(var.length, 0)
             for var in self.crossword.variables
         }
 
+    def domain_values(self, var):
+        """
+        Return list of words in the domain of `var`.
+        """
+        return self.crossword.vocabulary.words_in(
+            var.length, self.domains[var]
+        )
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -48,50 +108,48 @@ class CrosswordCreator():
         """
         Save crossword assignment to an image file.
         """
-        from PIL import Image, ImageDraw, ImageFont
-        cell_size = 100
-        cell_border = 2
-        interior_size = cell_size - 2 * cell_border
-        letters = self.letter_grid(assignment)
-
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.crossword.width * cell_size,
-             self.crossword.height * cell_size),
-            "black"
-        )
-        font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
-        draw = ImageDraw.Draw(img)
-
-        for i in range(self.crossword.height):
-            for j in range(self.crossword.width):
-
-                rect = [
-                    (j * cell_size + cell_border,
-                     i * cell_size + cell_border),
-                    ((j + 1) * cell_size - cell_border,
-                     (i + 1) * cell_size - cell_border)
-                ]
-                if self.crossword.structure[i][j]:
-                    draw.rectangle(rect, fill="white")
-                    if letters[i][j]:
-                        _, _, w, h = draw.textbbox((0, 0), letters[i][j], font=font)
-                        draw.text(
-                            (rect[0][0] + ((interior_size - w) / 2),
-                             rect[0][1] + ((interior_size - h) / 2) - 10),
-                            letters[i][j], fill="black", font=font
-                        )
-
-        img.save(filename)
+        from render import save
+        save(self.crossword.structure, self.letter_grid(assignment), filename)
 
     def solve(self):
         """
         Enforce node and arc consistency, and then solve the CSP.
+        Return None if there is no solution, or if the search ran out
+        of nodes, in which case `self.stats["exhausted"]` is True.
+        """
+        self.timed("node_consistency", self.enforce_node_consistency)
+        self.timed("ac3", self.ac3)
+        self.trail.clear()
+        try:
+            return self.timed("search", self.backtrack, dict())
+        except Exhausted:
+            self.stats["exhausted"] = True
+            return None
+
+    def timed(self, phase, function, *args):
+        """
+        Call `function` with `args`, adding the time it takes to the
+        seconds spent in `phase`, and return its result.
+        """
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            seconds = self.stats["seconds"]
+            seconds[phase] = (
+                seconds.get(phase, 0) + time.perf_counter() - start
+            )
+
+    def export_stats(self, filename=None):
+        """
+        Return search statistics as JSON, also writing them to `filename`
+        if given.
         """
-        self.enforce_node_consistency()
-        self.ac3()
-        return self.backtrack(dict())
+        contents = json.dumps(self.stats, indent=4)
+        if filename:
+            with open(filename, "w") as f:
+                f.write(contents)
+        return contents
 
     def enforce_node_consistency(self):
         """
@@ -99,11 +157,9 @@ class CrosswordCreator():
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
+        lengths = self.crossword.vocabulary.length_masks
         for var in self.domains:
-            # A copy is used to avoid `RuntimeError: Set changed size during iteration` 
-            for x in self.domains[var].copy():
-                if len(x) != var.length:
-                    self.domains[var].remove(x) 
+            self.domains[var] &= lengths.get(var.length, 0)
 
     def revise(self, x, y):
         """
@@ -114,14 +170,29 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        revised = False
-        for x_value in self.domains[x].copy():
-            if self.crossword.overlaps[x, y] is not None:
-                i, j = self.crossword.overlaps[x, y]
-                if all([x_value[i] != y_value[j] for y_value in self.domains[y]]):
-                    self.domains[x].remove(x_value)
-                    revised = True
-        return revised
+        self.stats["revise_calls"] += 1
+        if self.crossword.overlaps[x, y] is None:
+            return False
+        i, j = self.crossword.overlaps[x, y]
+
+        # Collect every `x` value whose ith letter is the jth letter
+        # of some value still in the domain of `y`
+        letter_masks = self.crossword.vocabulary.letter_masks
+        x_masks = letter_masks.get((x.length, i), {})
+        y_masks = letter_masks.get((y.length, j), {})
+        y_domain = self.domains[y]
+        supported = 0
+        for letter, y_mask in y_masks.items():
+            if y_domain & y_mask:
+                supported |= x_masks.get(letter, 0)
+
+        revised = self.domains[x] & supported
+        if revised == self.domains[x]:
+            return False
+        self.stats["revisions"] += 1
+        self.trail.append((x, self.domains[x]))
+        self.domains[x] = revised
+        return True
 
     def ac3(self, arcs=None):
         """
@@ -133,16 +204,23 @@ class CrosswordCreator():
         return False if one or more domains end up empty.
         """ 
         if arcs is None:
-            arcs = [key for key in self.crossword.overlaps.keys() if self.crossword.overlaps[*key] is not None]
-
-        while len(arcs) > 0:
-            x, y = arcs.pop(0)
+            arcs = list(self.crossword.overlaps.keys())
+
+        # Queue of arcs, plus a set to avoid queueing the same arc twice
+        queue = deque(arcs)
+        queued = set(queue)
+        while queue:
+            arc = queue.popleft()
+            queued.remove(arc)
+            self.stats["arcs"] += 1
+            x, y = arc
             if self.revise(x, y):
-                if len(self.domains[x]) == 0:
+                if not self.domains[x]:
                     return False
                 for z in self.crossword.neighbors(x):
-                    if z != y:
-                        arcs.append((z, x))
+                    if z != y and (z, x) not in queued:
+                        queue.append((z, x))
+                        queued.add((z, x))
         return True
 
     def assignment_complete(self, assignment):
@@ -172,6 +250,38 @@ class CrosswordCreator():
                         return False
         return True
 
+    def consistent_with(self, var, value, assignment):
+        """
+        Return True if assigning `value` to `var` keeps a consistent
+        `assignment` consistent; return False otherwise.
+        Only `var`'s own constraints are checked.
+        """
+        if value in self.used or len(value) != var.length:
+            return False
+        for n, i, j in self.crossword.adjacency[var]:
+            if n in assignment and value[i] != assignment[n][j]:
+                return False
+        return True
+
+    def letter_counts(self, var, position):
+        """
+        Return a dict mapping each letter to the number of values in the
+        domain of `var` that have that letter at `position`.
+        Counts are cached, and only recomputed once the domain has changed.
+        """
+        domain = self.domains[var]
+        cached = self.histograms.get((var, position))
+        if cached is not None and cached[0] == domain:
+            return cached[1]
+        letter_masks = self.crossword.vocabulary.letter_masks
+        masks = letter_masks.get((var.length, position), {})
+        counts = {
+            letter: (domain & mask).bit_count()
+            for letter, mask in masks.items()
+        }
+        self.histograms[var, position] = (domain, counts)
+        return counts
+
     def order_domain_values(self, var, assignment):
         """
         Return a list of values in the domain of `var`, in order by
@@ -179,22 +289,24 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
+        # For each unassigned neighbor: its domain size, how many of its
+        # values have each letter at the overlap, and our overlap index
+        neighbors = [
+            (self.domains[n].bit_count(), self.letter_counts(n, j), i)
+            for n, i, j in self.crossword.adjacency[var]
+            if n not in assignment
+        ]
+
+        def ruled_out(value):
+            return sum(
+                size - counts.get(value[i], 0)
+                for size, counts, i in neighbors
+            )
 
-        def compute_constraining_values(self, var, value, assignment):
-            n = 0
-            for unassigned_neighbor in [item for item in self.crossword.neighbors(var) if item not in assignment.keys()]:
-                if self.crossword.overlaps[var, unassigned_neighbor]:
-                    i, j = self.crossword.overlaps[var, unassigned_neighbor]
-                    for unassigned_neighbor_value in self.domains[unassigned_neighbor]:
-                        if value[i] != unassigned_neighbor_value[j]:
-                            n += 1
-            return n
-        
-        values = [value for value in self.domains[var]]
-        constraining_values = {value: compute_constraining_values(self, var, value, assignment) 
-                               for value in self.domains[var]}
-        
-        return sorted(values, key=constraining_values.__getitem__)
+        values = self.domain_values(var)
+        if self.random is not None:
+            self.random.shuffle(values)
+        return sorted(values, key=ruled_out)
 
     def select_unassigned_variable(self, assignment):
         """
@@ -204,30 +316,13 @@ class CrosswordCreator():
         degree. If there is a tie, any of the tied variables are acceptable
         return values.
         """
-        def compute_remaining_values(self, unassigned_variables):
-            remaining_values = {}
-            for var in unassigned_variables:
-                remaining_values[var] = len(self.domains[var])
-            return remaining_values
-        
-        def compute_degrees(self, unassigned_variables):
-            degrees = {}
-            for var in unassigned_variables:
-                degrees[var] = len(self.crossword.neighbors(var))
-            return degrees
-        
-        unassigned_variables = [
-            item for item in self.crossword.variables if item not in assignment.keys()]
-        remaining_values = compute_remaining_values(self, unassigned_variables)
-        min_remaining_values = [
-            var for var in remaining_values.keys() if remaining_values[var] == min(remaining_values.values())]
-
-        if len(min_remaining_values) == 1:
-            return min_remaining_values[0]
-        
-        degrees = compute_degrees(self, min_remaining_values)
-        highest_degrees = [var for var in degrees.keys() if degrees[var] == min(degrees.values())]
-        return highest_degrees[0]
+        return min(
+            (var for var in self.crossword.variables if var not in assignment),
+            key=lambda var: (
+                self.domains[var].bit_count(),
+                -len(self.crossword.adjacency[var])
+            )
+        )
 
     def backtrack(self, assignment):
         """
@@ -238,21 +333,59 @@ class CrosswordCreator():
 
         If no assignment is possible, return None.
         """
+        self.stats["nodes"] += 1
+        if self.max_nodes is not None and self.stats["nodes"] > self.max_nodes:
+            raise Exhausted
+        if self.trace:
+            self.stats["domain_sizes"].append(
+                sum(domain.bit_count() for domain in self.domains.values())
+            )
 
         if self.assignment_complete(assignment):
             return assignment
-        
+
         var = self.select_unassigned_variable(assignment)
 
         for value in self.order_domain_values(var, assignment):
+            if not self.consistent_with(var, value, assignment):
+                continue
             assignment[var] = value
-            if self.consistent(assignment):
+            self.used.add(value)
+            mark = len(self.trail)
+            if self.inference(var, value, assignment):
                 result = self.backtrack(assignment)
                 if result is not None:
                     return result
+            self.stats["backtracks"] += 1
+            self.undo(mark)
+            self.used.remove(value)
             assignment.pop(var)
         return None
 
+    def inference(self, var, value, assignment):
+        """
+        Propagate the assignment of `value` to `var` into the domains of
+        the unassigned variables, if the search strategy calls for it.
+
+        Return False if some domain ends up empty; return True otherwise.
+        """
+        if self.strategy != CrosswordCreator.MAC:
+            return True
+        self.trail.append((var, self.domains[var]))
+        self.domains[var] = 1 << self.crossword.vocabulary.word_index[value]
+        return self.ac3([
+            (z, var) for z in self.crossword.neighbors(var)
+            if z not in assignment
+        ])
+
+    def undo(self, mark):
+        """
+        Restore every domain changed since the trail had length `mark`.
+        """
+        while len(self.trail) > mark:
+            var, domain = self.trail.pop()
+            self.domains[var] = domain
+
 def main():
 
     # Check usage
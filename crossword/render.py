@@ -0,0 +1,89 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+FONT = "assets/fonts/OpenSans-Regular.ttf"
+FONT_SIZE = 80
+CELL_SIZE = 100
+CELL_BORDER = 2
+
+# Letters are drawn this far above center in a cell of CELL_SIZE, and
+# scaled, like FONT_SIZE, in proportion to other cell sizes
+LETTER_RAISE = 10
+
+
+@lru_cache(maxsize=None)
+def font(path=FONT, size=FONT_SIZE):
+    """
+    Return the TrueType font at `path`, loading it only once.
+    """
+    return ImageFont.truetype(path, size)
+
+
+@lru_cache(maxsize=None)
+def tile(letter, cell_size=CELL_SIZE, cell_border=CELL_BORDER):
+    """
+    Return the image of one open cell holding `letter` (or nothing, if
+    `letter` is None), rendering each distinct tile only once.
+    """
+    interior_size = cell_size - 2 * cell_border
+    letter_font = font(FONT, cell_size * FONT_SIZE // CELL_SIZE)
+    raise_by = LETTER_RAISE * cell_size / CELL_SIZE
+    img = Image.new("RGBA", (cell_size, cell_size), "black")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle(
+        [(cell_border, cell_border),
+         (cell_size - cell_border, cell_size - cell_border)],
+        fill="white"
+    )
+    if letter:
+        _, _, w, h = draw.textbbox((0, 0), letter, font=letter_font)
+        draw.text(
+            (cell_border + ((interior_size - w) / 2),
+             cell_border + ((interior_size - h) / 2) - raise_by),
+            letter, fill="black", font=letter_font
+        )
+    return img
+
+
+def render(structure, letters, cell_size=CELL_SIZE):
+    """
+    Return an image of a crossword, given its `structure` (a 2D list of
+    whether each cell is open) and `letters` (a 2D list of the letter in
+    each cell, or None).
+    """
+    height = len(structure)
+    width = len(structure[0]) if structure else 0
+    img = Image.new("RGBA", (width * cell_size, height * cell_size), "black")
+    for i in range(height):
+        for j in range(width):
+            if structure[i][j]:
+                img.paste(
+                    tile(letters[i][j], cell_size),
+                    (j * cell_size, i * cell_size)
+                )
+    return img
+
+
+def save(structure, letters, filename, cell_size=CELL_SIZE):
+    """
+    Render a crossword and save it to an image file.
+    """
+    render(structure, letters, cell_size).save(filename)
+
+
+def save_all(grids, filenames, workers=None):
+    """
+    Render each (structure, letters) pair in `grids` and save it to the
+    corresponding file in `filenames`, across a pool of `workers` processes.
+    """
+    grids = list(grids)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(
+            save,
+            [structure for structure, _ in grids],
+            [letters for _, letters in grids],
+            filenames,
+            chunksize=max(1, len(grids) // 64)
+        ))
@@ -0,0 +1,207 @@
+import argparse
+import json
+import random
+import time
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Beginner, intermediate, and expert boards, as HEIGHTxWIDTHxMINES
+BOARDS = ["8x8x8", "16x16x40", "16x30x99"]
+
+
+def parse_board(text):
+    """
+    Returns (height, width, mines) for a board written HEIGHTxWIDTHxMINES.
+    """
+    try:
+        height, width, mines = (int(n) for n in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"board must be HEIGHTxWIDTHxMINES, not {text!r}"
+        )
+    if mines >= height * width:
+        raise argparse.ArgumentTypeError(f"too many mines for {text}")
+    return height, width, mines
+
+
+def play(height, width, mines, games, seed=None, flood=False):
+    """
+    Plays `games` games of Minesweeper with the AI on `height` by `width`
+    boards with `mines` mines. If `flood`, each move reveals the whole
+    region around a cell with no nearby mines, as one batch of knowledge.
+    Returns (wins, moves, choices, inferences), where `moves` is an array
+    of the number of safe moves made in each game, and `choices` and
+    `inferences` are arrays of the seconds each move took to choose and
+    to add to the AI's knowledge.
+    """
+    random.seed(seed)
+    wins = 0
+    moves = array("I")
+    choices = array("d")
+    inferences = array("d")
+
+    for _ in range(games):
+        game = Minesweeper(height=height, width=width, mines=mines)
+        ai = MinesweeperAI(height=height, width=width, mines=mines)
+        revealed = 0
+        made = 0
+        while revealed < height * width - mines:
+
+            # Choose a move, safe if possible
+            start = time.perf_counter()
+            move = ai.make_safe_move()
+            if move is None:
+                move = ai.make_random_move()
+            choices.append(time.perf_counter() - start)
+            if move is None or game.is_mine(move):
+                break
+
+            # Tell the AI what the move revealed
+            if flood:
+                pairs = game.reveal(move)
+                start = time.perf_counter()
+                ai.add_knowledge_batch(pairs)
+                revealed += len(pairs)
+            else:
+                start = time.perf_counter()
+                ai.add_knowledge(move, game.nearby_mines(move))
+                revealed += 1
+            inferences.append(time.perf_counter() - start)
+            made += 1
+        else:
+            wins += 1
+        moves.append(made)
+
+    return wins, moves, choices, inferences
+
+
+def benchmark(boards, games, processes=1, seed=0, flood=False):
+    """
+    Plays `games` games on each of `boards`, split across `processes`
+    processes. Returns a dict mapping each board to the combined results
+    of `play`.
+    """
+    tasks = []
+    for board in boards:
+        chunks = min(games, 4 * processes)
+        for n in range(chunks):
+            share = games // chunks + (1 if n < games % chunks else 0)
+            tasks.append((board, share, seed + n))
+
+    results = {
+        board: [0, array("I"), array("d"), array("d")] for board in boards
+    }
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            (board, pool.submit(play, *board, share, task_seed, flood))
+            for board, share, task_seed in tasks
+        ]
+        for board, future in futures:
+            wins, moves, choices, inferences = future.result()
+            totals = results[board]
+            totals[0] += wins
+            totals[1].extend(moves)
+            totals[2].extend(choices)
+            totals[3].extend(inferences)
+    return {board: tuple(totals) for board, totals in results.items()}
+
+
+def percentile(values, p):
+    """
+    Returns the `p`th percentile of sorted `values`.
+    """
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def summary(values, scale=1):
+    """
+    Returns a dict of the mean and percentiles of `values`, times `scale`.
+    """
+    values = sorted(values)
+    stats = {"mean": scale * sum(values) / len(values) if values else 0}
+    for p in [50, 90, 99]:
+        stats[f"p{p}"] = scale * percentile(values, p)
+    stats["max"] = scale * (values[-1] if values else 0)
+    return stats
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description="Play many headless games of Minesweeper with the AI."
+    )
+    parser.add_argument("-b", "--board", type=parse_board, action="append",
+                        help="board as HEIGHTxWIDTHxMINES (repeatable)")
+    parser.add_argument("-d", "--density", type=float, action="append",
+                        help="fraction of cells that are mines, replacing "
+                             "each board's mine count (repeatable)")
+    parser.add_argument("-n", "--games", type=int, default=1000,
+                        help="games per board")
+    parser.add_argument("-p", "--processes", type=int, default=1)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-f", "--flood", action="store_true",
+                        help="reveal regions with no nearby mines at once")
+    parser.add_argument("-o", "--output", default=None,
+                        help="file to write results to as JSON")
+    args = parser.parse_args()
+
+    # Build the list of boards to play
+    boards = args.board or [parse_board(board) for board in BOARDS]
+    if args.density:
+        boards = [
+            (height, width, max(1, round(height * width * density)))
+            for height, width, _ in boards
+            for density in args.density
+        ]
+
+    # Play games
+    start = time.perf_counter()
+    results = benchmark(
+        boards, args.games, args.processes, args.seed, args.flood
+    )
+    seconds = time.perf_counter() - start
+    total = args.games * len(boards)
+    print(f"{total} games in {seconds:.2f}s ({total / seconds:.1f} games/sec)")
+
+    # Report results
+    report = []
+    for (height, width, mines), totals in results.items():
+        wins, moves, choices, inferences = totals
+        entry = {
+            "height": height,
+            "width": width,
+            "mines": mines,
+            "games": args.games,
+            "wins": wins,
+            "win_rate": wins / args.games,
+            "moves": summary(moves),
+            "choice_ms": summary(choices, 1000),
+            "inference_ms": summary(inferences, 1000)
+        }
+        report.append(entry)
+        print(f"{height}x{width}, {mines} mines: "
+              f"won {wins}/{args.games} ({100 * entry['win_rate']:.1f}%), "
+              f"{entry['moves']['mean']:.1f} moves/game")
+        for label, key in [("choice", "choice_ms"),
+                           ("inference", "inference_ms")]:
+            stats = entry[key]
+            print(
+                f"  {label} latency, ms: "
+                + ", ".join(
+                    f"{name} {value:.3f}" for name, value in stats.items()
+                )
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
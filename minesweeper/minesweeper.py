@@ -1,6 +1,11 @@
 import itertools
+import math
 import random
 
+from collections import deque
+
+import numpy as np
+
 
 class Minesweeper():
     """
@@ -12,26 +17,25 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
-
-        # At first, player has found no mines
+        # Add mines randomly, as a grid of whether each cell is a mine
+        cells = random.sample(range(height * width), mines)
+        self.mines = set(divmod(k, width) for k in cells)
+        self.board = np.zeros(height * width, dtype=bool)
+        self.board[cells] = True
+        self.board = self.board.reshape(height, width)
+
+        # Count the mines around each cell, summing the shifted grids
+        padded = np.pad(self.board, 1).astype(np.uint8)
+        self.counts = np.zeros((height, width), dtype=np.uint8)
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    self.counts += padded[di:di + height, dj:dj + width]
+
+        # At first, player has found no mines and revealed no cells
         self.mines_found = set()
+        self.revealed = set()
 
     def print(self):
         """
@@ -50,7 +54,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +62,36 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        i, j = cell
+        return int(self.counts[i, j])
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+    def reveal(self, cell):
+        """
+        Reveals a safe cell and, if it has no nearby mines, the connected
+        region of cells with no nearby mines around it and that region's
+        border, as clicking the cell does in most Minesweeper games.
+        Returns a list of (cell, count) pairs for the newly revealed cells.
+        """
+        if self.is_mine(cell) or cell in self.revealed:
+            return []
+
+        # Breadth-first search outward from cells with no nearby mines
+        pairs = []
+        self.revealed.add(cell)
+        frontier = deque([cell])
+        while frontier:
+            i, j = frontier.popleft()
+            count = int(self.counts[i, j])
+            pairs.append(((i, j), count))
+            if count:
+                continue
+            for k in range(max(i - 1, 0), min(i + 2, self.height)):
+                for l in range(max(j - 1, 0), min(j + 2, self.width)):
+                    if (k, l) not in self.revealed:
+                        self.revealed.add((k, l))
+                        frontier.append((k, l))
+
+        return pairs
 
     def won(self):
         """
@@ -84,17 +100,64 @@ class Minesweeper():
         return self.mines_found == self.mines
 
 
+def bits(mask):
+    """
+    Yields the index of every set bit in `mask`, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
 class Sentence():
     """
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    Cells are stored as a bitmask over the board, where cell (i, j)
+    is bit i * width + j.
     """
 
-    def __init__(self, cells, count):
-        self.cells = set(cells)
+    def __init__(self, cells, count, width=None):
+        cells = set(cells)
+        if width is None:
+            width = max((j for _, j in cells), default=0) + 1
+        self.width = width
+        self.mask = 0
+        for i, j in cells:
+            self.mask |= 1 << (i * width + j)
         self.count = count
 
+    @classmethod
+    def from_mask(cls, mask, count, width):
+        """
+        Returns the sentence for a bitmask of cells.
+        """
+        sentence = cls((), count, width)
+        sentence.mask = mask
+        return sentence
+
+    @property
+    def cells(self):
+        return set(divmod(k, self.width) for k in bits(self.mask))
+
+    def bits(self):
+        """
+        Returns list of the bit indices of the sentence's cells.
+        """
+        return list(bits(self.mask))
+
+    def bit(self, cell):
+        """
+        Returns the bitmask of a cell, or 0 if it cannot be in the sentence.
+        """
+        i, j = cell
+        if not (0 <= j < self.width and i >= 0):
+            return 0
+        return 1 << (i * self.width + j)
+
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
@@ -105,7 +168,7 @@ class Sentence():
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        if len(self.cells) == self.count:
+        if self.mask.bit_count() == self.count:
             return self.cells
         return set()
 
@@ -122,8 +185,8 @@ class Sentence():
         Updates internal knowledge representation given the fact that
         a cell is known to be a mine.
         """
-        if cell in  self.cells:
-            self.cells.remove(cell)
+        if self.mask & self.bit(cell):
+            self.mask &= ~self.bit(cell)
             self.count -= 1
 
     def mark_safe(self, cell):
@@ -131,8 +194,112 @@ class Sentence():
         Updates internal knowledge representation given the fact that
         a cell is known to be safe.
         """
-        if cell in  self.cells:
-            self.cells.remove(cell)
+        self.mask &= ~self.bit(cell)
+
+
+class Knowledge():
+    """
+    Knowledge base of sentences, with no duplicate or empty sentences,
+    and an index from each cell's bit to the sentences that mention it.
+    Sentences are identified by an integer id that does not change as
+    cells are marked. All sentences share the board width `width`.
+    """
+
+    def __init__(self, width):
+
+        # Sentences by id, ids by key, and ids of sentences mentioning each bit
+        self.sentences = dict()
+        self.keys = dict()
+        self.index = dict()
+        self.next_id = 0
+        self.width = width
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __contains__(self, sentence):
+        return Knowledge.key(self.fit(sentence)) in self.keys
+
+    def fit(self, sentence):
+        """
+        Returns the sentence, rebuilt over the knowledge base's board
+        width if it was built over another.
+        """
+        if sentence.width != self.width:
+            return Sentence(sentence.cells, sentence.count, self.width)
+        return sentence
+
+    @staticmethod
+    def key(sentence):
+        """
+        Returns a hashable key identifying the sentence.
+        """
+        return sentence.mask, sentence.count
+
+    def add(self, sentence):
+        """
+        Adds a sentence, unless it is empty or already known.
+        Returns its id if added, None otherwise.
+        """
+        sentence = self.fit(sentence)
+        key = Knowledge.key(sentence)
+        if not sentence.mask or key in self.keys:
+            return None
+        number = self.next_id
+        self.next_id += 1
+        self.sentences[number] = sentence
+        self.keys[key] = number
+        for k in bits(sentence.mask):
+            self.index.setdefault(k, set()).add(number)
+        return number
+
+    def discard(self, number):
+        """
+        Removes the sentence with the given id, whose key has already
+        been removed.
+        """
+        sentence = self.sentences.pop(number)
+        for k in bits(sentence.mask):
+            ids = self.index[k]
+            ids.discard(number)
+            if not ids:
+                del self.index[k]
+
+    def mark(self, k, mine):
+        """
+        Marks the cell at bit `k` as a mine (or safe) in every sentence
+        mentioning it. Returns the ids of the sentences that changed
+        and were kept.
+        """
+        changed = []
+        for number in self.index.pop(k, ()):
+            sentence = self.sentences[number]
+            del self.keys[sentence.mask, sentence.count]
+            sentence.mask &= ~(1 << k)
+            if mine:
+                sentence.count -= 1
+            key = Knowledge.key(sentence)
+            if not sentence.mask or key in self.keys:
+                self.discard(number)
+            else:
+                self.keys[key] = number
+                changed.append(number)
+        return changed
+
+    def related(self, sentence):
+        """
+        Returns the other sentences sharing a cell with the sentence.
+        """
+        ids = set()
+        for k in bits(sentence.mask):
+            ids.update(self.index[k])
+        return [
+            self.sentences[number] for number in ids
+            if self.sentences[number] is not sentence
+        ]
 
 
 class MinesweeperAI():
@@ -140,11 +307,16 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    # Largest group of linked cells whose mine configurations are
+    # enumerated exactly; larger groups use each sentence's mine density
+    ENUMERATION_LIMIT = 40
+
+    def __init__(self, height=8, width=8, mines=None):
 
-        # Set initial height and width
+        # Set initial height and width, and total number of mines if known
         self.height = height
         self.width = width
+        self.total_mines = mines
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -153,26 +325,59 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Cells known to be safe that have not been chosen yet
+        self.safe_moves = set()
+
+        # Sentences about the game known to be true
+        self.knowledge = Knowledge(width)
+
+        # Ids of sentences to draw inferences from
+        self.pending = deque()
+
+    def bit(self, cell):
+        """
+        Returns the bit index of a cell.
+        """
+        i, j = cell
+        return i * self.width + j
+
+    def cell(self, k):
+        """
+        Returns the cell at a bit index.
+        """
+        return divmod(k, self.width)
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
-        self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.mark(self.bit(cell), mine=True)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.mark(self.bit(cell), mine=False)
+
+    def mark(self, k, mine):
+        """
+        Marks the cell at bit `k` as a mine (or safe), and updates the
+        sentences mentioning it, unless it is already marked.
+        """
+        cell = divmod(k, self.width)
+        if mine:
+            if cell in self.mines:
+                return
+            self.mines.add(cell)
+        else:
+            if cell in self.safes:
+                return
+            self.safes.add(cell)
+            if cell not in self.moves_made:
+                self.safe_moves.add(cell)
+        self.pending.extend(self.knowledge.mark(k, mine))
 
     def add_knowledge(self, cell, count):
         """
@@ -189,61 +394,84 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
+        # 1, 2, 3
+        self.observe(cell, count)
+        # 4, 5
+        self.infer()
+
+    def add_knowledge_batch(self, pairs):
+        """
+        Adds the knowledge from many (cell, count) pairs at once, such
+        as those returned by Minesweeper.reveal, drawing inferences only
+        once all of them have been added.
+        """
+        for cell, count in pairs:
+            self.observe(cell, count)
+        self.infer()
+
+    def observe(self, cell, count):
+        """
+        Marks a safe cell as a move that has been made, and adds the
+        sentence that `count` of its unknown neighbors are mines.
+        """
         # 1
         self.moves_made.add(cell)
+        self.safe_moves.discard(cell)
         # 2
         self.mark_safe(cell)
         # 3
         i, j = cell
-        sentence_cells = set()
-        for k in range(max(i-1, 0), min(i+2, self.height)):
-            for l in range(max(j-1, 0), min(j+2, self.width)):
-                if (k, l) not in self.safes :
-                    if (k, l) in self.mines:
-                        count -= 1
-                    else:
-                        sentence_cells.add((k, l))
-        if sentence_cells:
-            self.knowledge.append(Sentence(sentence_cells, count))
-        # 4
-        knowledge_changed = True
-        while knowledge_changed:
-            knowledge_changed = False
-            new_safes = set()
-            new_mines = set()
+        mask = 0
+        for k in range(max(i - 1, 0), min(i + 2, self.height)):
+            for l in range(max(j - 1, 0), min(j + 2, self.width)):
+                if (k, l) in self.mines:
+                    count -= 1
+                elif (k, l) not in self.safes:
+                    mask |= 1 << (k * self.width + l)
+        number = self.knowledge.add(Sentence.from_mask(mask, count, self.width))
+        if number is not None:
+            self.pending.append(number)
+
+    def infer(self):
+        """
+        Draws inferences from pending sentences until none are left:
+        marks the cells of any sentence known to be all safe or all
+        mines, and adds the difference between any sentence and a
+        sentence it is a subset of.
+        """
+        while self.pending:
+            number = self.pending.popleft()
+            sentence = self.knowledge.sentences.get(number)
+            if sentence is None:
+                continue
 
             # Collect safe and mine cells from sentences
-            for sentence in self.knowledge:
-                for cell in sentence.known_safes():
-                    if cell not in self.safes:
-                        new_safes.add(cell)
-                for cell in sentence.known_mines():
-                    if cell not in self.mines:
-                        new_mines.add(cell)
-
-            # Apply the collected safe and mine cells
-            if new_safes:
-                knowledge_changed = True
-                for cell in new_safes:
-                    self.mark_safe(cell)
-            if new_mines:
-                knowledge_changed = True
-                for cell in new_mines:
-                    self.mark_mine(cell)
-            # 5
-            new_sentences = []
-            for sentence1 in self.knowledge:
-                for sentence2 in self.knowledge:
-                    if sentence1 != sentence2 and sentence1.cells.issubset(sentence2.cells):
-                        inferred_cells = sentence2.cells - sentence1.cells
-                        inferred_count = sentence2.count - sentence1.count
-                        if inferred_cells:
-                            new_sentences.append(Sentence(inferred_cells, inferred_count))
-
-            for new_sentence in new_sentences:
-                if new_sentence not in self.knowledge:
-                    self.knowledge.append(new_sentence)
-    
+            if sentence.count == 0:
+                for k in sentence.bits():
+                    self.mark(k, mine=False)
+                continue
+            if sentence.count == sentence.mask.bit_count():
+                for k in sentence.bits():
+                    self.mark(k, mine=True)
+                continue
+
+            # Only sentences sharing a cell can be subsets of one another
+            for other in self.knowledge.related(sentence):
+                if sentence.mask == other.mask:
+                    continue
+                if sentence.mask & ~other.mask == 0:
+                    subset, superset = sentence, other
+                elif other.mask & ~sentence.mask == 0:
+                    subset, superset = other, sentence
+                else:
+                    continue
+                number = self.knowledge.add(Sentence.from_mask(
+                    superset.mask & ~subset.mask,
+                    superset.count - subset.count,
+                    self.width
+                ))
+                if number is not None:
+                    self.pending.append(number)
 
     def make_safe_move(self):
         """
@@ -254,8 +482,8 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        # Iterate over all known safe cells
-        for cell in self.safes:
+        # Iterate over known safe cells not yet chosen
+        for cell in self.safe_moves:
         # Check if the cell has not been moved yet
             if cell not in self.moves_made:
                 return cell
@@ -263,22 +491,241 @@ class MinesweeperAI():
         # If no safe moves are available, return None
         return None
 
+    def components(self):
+        """
+        Returns the sentences split into independent groups: a list of
+        (bits, sentences) pairs, where no two groups share a cell.
+        """
+        parent = {cell: cell for cell in self.knowledge.index}
+
+        def find(cell):
+            while parent[cell] != cell:
+                parent[cell] = parent[parent[cell]]
+                cell = parent[cell]
+            return cell
+
+        for sentence in self.knowledge:
+            cells = iter(bits(sentence.mask))
+            root = find(next(cells))
+            for cell in cells:
+                parent[find(cell)] = root
+
+        groups = dict()
+        for sentence in self.knowledge:
+            cells = sentence.bits()
+            root = find(cells[0])
+            groups.setdefault(root, (set(), []))
+            groups[root][0].update(cells)
+            groups[root][1].append(sentence)
+        return list(groups.values())
+
+    @staticmethod
+    def solutions(cells, sentences):
+        """
+        Enumerates every assignment of mines to `cells` (bit indices)
+        consistent with `sentences`. Returns a dict mapping each number of mines to
+        (number of assignments, dict of how many of those assignments
+        have a mine in each cell).
+        """
+
+        # Order cells so that each sentence is completed as early as possible
+        order = []
+        seen = set()
+        members = [sentence.bits() for sentence in sentences]
+        for sentence_cells in sorted(members, key=len):
+            for cell in sentence_cells:
+                if cell not in seen:
+                    seen.add(cell)
+                    order.append(cell)
+        for cell in cells:
+            if cell not in seen:
+                order.append(cell)
+        position = {cell: n for n, cell in enumerate(order)}
+
+        # For each sentence: its count, mines so far, cells not yet assigned
+        counts = [sentence.count for sentence in sentences]
+        mines = [0] * len(sentences)
+        unassigned = [len(sentence_cells) for sentence_cells in members]
+        constraints = [[] for _ in order]
+        for n, sentence_cells in enumerate(members):
+            for cell in sentence_cells:
+                constraints[position[cell]].append(n)
+
+        assignment = [0] * len(order)
+        results = dict()
+
+        def search(p, total):
+            if p == len(order):
+                result = results.setdefault(total, [0, [0] * len(order)])
+                result[0] += 1
+                per_cell = result[1]
+                for q, value in enumerate(assignment):
+                    per_cell[q] += value
+                return
+            for value in (0, 1):
+                consistent = True
+                for n in constraints[p]:
+                    mines[n] += value
+                    unassigned[n] -= 1
+                    if mines[n] > counts[n] or mines[n] + unassigned[n] < counts[n]:
+                        consistent = False
+                if consistent:
+                    assignment[p] = value
+                    search(p + 1, total + value)
+                for n in constraints[p]:
+                    mines[n] -= value
+                    unassigned[n] += 1
+
+        search(0, 0)
+        return {
+            total: (count, dict(zip(order, per_cell)))
+            for total, (count, per_cell) in results.items()
+        }
+
+    def probabilities(self):
+        """
+        Returns (probabilities, estimated): a dict mapping each cell not
+        yet chosen or known to be a mine to the probability that it is a
+        mine, given the knowledge base and, if known, the total number of
+        mines on the board, and the set of cells whose probability is
+        only an estimate.
+        """
+        unknown = set(
+            (i, j) for i in range(self.height) for j in range(self.width)
+        ) - self.moves_made - self.mines - self.safes
+        probabilities = {cell: 0.0 for cell in self.safes - self.moves_made}
+        estimated = set()
+        if not unknown:
+            return probabilities, estimated
+
+        # Enumerate each independent group of cells on its own, and
+        # estimate groups too large to enumerate from their densities
+        groups = []
+        for cells, sentences in self.components():
+            if len(cells) > MinesweeperAI.ENUMERATION_LIMIT:
+                for k in cells:
+                    estimated.add(self.cell(k))
+                    probabilities[self.cell(k)] = max(
+                        sentence.count / sentence.mask.bit_count()
+                        for sentence in sentences if sentence.mask >> k & 1
+                    )
+                continue
+            groups.append(MinesweeperAI.solutions(cells, sentences))
+        constrained = set(self.cell(k) for k in self.knowledge.index)
+        unconstrained = unknown - constrained
+
+        # The total number of mines only constrains the enumerated groups
+        # if every mine outside them is among the unconstrained cells
+        remaining = (
+            self.total_mines - len(self.mines)
+            if self.total_mines is not None and not estimated else None
+        )
+
+        def weight(mines):
+            # Ways to place the other mines among unconstrained cells
+            if remaining is None:
+                return 1
+            if remaining < mines:
+                return 0
+            return math.comb(len(unconstrained), remaining - mines)
+
+        def convolve(a, b):
+            c = dict()
+            for m, x in a.items():
+                for n, y in b.items():
+                    c[m + n] = c.get(m + n, 0) + x * y
+            return c
+
+        # Distribution of mine counts over all groups but each one
+        distributions = [
+            {m: count for m, (count, _) in group.items()} for group in groups
+        ]
+        prefixes = [{0: 1}]
+        for distribution in distributions:
+            prefixes.append(convolve(prefixes[-1], distribution))
+        suffixes = [{0: 1}]
+        for distribution in reversed(distributions):
+            suffixes.append(convolve(suffixes[-1], distribution))
+        suffixes.reverse()
+        total = sum(count * weight(m) for m, count in prefixes[-1].items())
+        if total == 0:
+            return probabilities, estimated
+
+        for n, group in enumerate(groups):
+            others = convolve(prefixes[n], suffixes[n + 1])
+            numerators = dict()
+            for m, (count, per_cell) in group.items():
+                ways = sum(
+                    other * weight(m + k) for k, other in others.items()
+                )
+                for cell, mines in per_cell.items():
+                    numerators[cell] = numerators.get(cell, 0) + mines * ways
+            for k, numerator in numerators.items():
+                probabilities[self.cell(k)] = numerator / total
+
+        # Cells no sentence mentions share the remaining mines evenly
+        if unconstrained:
+            if remaining is None:
+                estimated |= unconstrained
+                expected = sum(probabilities[cell] for cell in constrained)
+                if self.total_mines is not None:
+                    density = min(max(
+                        (self.total_mines - len(self.mines) - expected)
+                        / len(unconstrained), 0.0
+                    ), 1.0)
+                else:
+                    density = (
+                        expected / len(constrained) if constrained else 0.5
+                    )
+            else:
+                density = sum(
+                    count * weight(m) * (remaining - m)
+                    for m, count in prefixes[-1].items()
+                ) / (total * len(unconstrained))
+            for cell in unconstrained:
+                probabilities[cell] = density
+
+        return probabilities, estimated
+
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        Of those, chooses randomly among the cells least likely to be mines,
+        first marking any cells the probabilities prove safe or mines.
         """
-        # Create a set of all possible cells on the board
-        all_cells = set((i, j) for i in range(self.height) for j in range(self.width))
-        
-        # Remove cells that have been moved or are known to be mines
-        possible_moves = all_cells - self.moves_made - self.mines
-        
+        probabilities, estimated = self.probabilities()
+
         # If there are no possible moves, return None
-        if not possible_moves:
+        if not probabilities:
             return None
-        
-        # Choose a random cell from the remaining possible moves
-        return random.choice(list(possible_moves))
+
+        # Mark cells proven to be safe or mines
+        for cell, probability in probabilities.items():
+            if cell in estimated:
+                continue
+            if probability == 1:
+                self.mark_mine(cell)
+            elif probability == 0:
+                self.mark_safe(cell)
+        self.infer()
+        move = self.make_safe_move()
+        if move is not None:
+            return move
+
+        # If every remaining cell is now known to be a mine, return None
+        candidates = {
+            cell: probability for cell, probability in probabilities.items()
+            if cell not in self.mines
+        }
+        if not candidates:
+            return None
+
+        # Choose randomly among the least risky remaining moves
+        lowest = min(candidates.values())
+        return random.choice([
+            cell for cell, probability in candidates.items()
+            if probability == lowest
+        ])
@@ -2,6 +2,11 @@ import math
 import random
 import time
 
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
 
 class Nim():
 
@@ -165,16 +170,193 @@ class NimAI():
             return random.choice(actions)
 
 
-def train(n):
+class ArrayNimAI(NimAI):
+
+    def __init__(self, initial=[1, 3, 5, 7], alpha=0.5, epsilon=0.1):
+        """
+        Initialize AI with a Q-value of 0 for every `(state, action)`
+        pair of games starting from piles `initial`, stored in a
+        NumPy array `self.q` with a row per state and a column per action.
+
+        States are numbered by reading the piles as a mixed-radix number,
+        where pile `i` is a digit of radix `initial[i] + 1`, and actions
+        are numbered by pile, then count. `self.actions[s]` is the array
+        of actions available in state `s`, `self.available[s, a]` is
+        whether action `a` is, and taking action `a` in state `s` leads to
+        state `s - self.deltas[a]`.
+        """
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.initial = initial.copy()
+
+        # Place value of each pile in a state's number
+        radices = np.array(initial) + 1
+        self.strides = np.concatenate(([1], np.cumprod(radices)[:-1]))
+        states = int(np.prod(radices))
+
+        # Every action, and the change it makes to a state's number
+        self.moves = [
+            (i, j) for i, pile in enumerate(initial)
+            for j in range(1, pile + 1)
+        ]
+        self.indices = {action: a for a, action in enumerate(self.moves)}
+        piles = np.array([i for i, _ in self.moves], dtype=np.intp)
+        counts = np.array([j for _, j in self.moves], dtype=np.intp)
+        self.deltas = counts * self.strides[piles]
+
+        # Actions available in each state
+        sizes = np.arange(states)[:, None] // self.strides % radices
+        self.available = counts <= sizes[:, piles]
+        self.actions = [np.flatnonzero(row) for row in self.available]
+        self.start = self.encode(initial)
+
+        self.q = np.zeros((states, len(self.moves)))
+
+    def encode(self, state):
+        """
+        Return the number of the state with piles `state`.
+        """
+        return int(np.dot(state, self.strides))
+
+    def get_q_value(self, state, action):
+        """
+        Return the Q-value for the state `state` and the action `action`.
+        """
+        return self.q[self.encode(state), self.indices[action]]
+
+    def update_q_value(self, state, action, old_q, reward, future_rewards):
+        """
+        Update the Q-value for the state `state` and the action `action`,
+        as NimAI.update_q_value does.
+        """
+        self.q[self.encode(state), self.indices[action]] = (
+            old_q + self.alpha * (reward + future_rewards - old_q)
+        )
+
+    def best_future_reward(self, state):
+        """
+        Return the maximum Q-value of the actions available in `state`,
+        or 0 if there are none.
+        """
+        return self.best_value(self.encode(state))
+
+    def choose_action(self, state, epsilon=True):
+        """
+        Given a state `state`, return an action `(i, j)` to take,
+        as NimAI.choose_action does.
+        """
+        return self.moves[self.choose(self.encode(state), epsilon)]
+
+    def best_value(self, s):
+        """
+        Return the maximum Q-value of the actions available in the state
+        numbered `s`, or 0 if there are none.
+        """
+        actions = self.actions[s]
+        if len(actions) == 0:
+            return 0
+        return self.q[s, actions].max()
+
+    def choose(self, s, epsilon=True):
+        """
+        Return the number of an action to take in the state numbered `s`,
+        chosen as by choose_action.
+        """
+        actions = self.actions[s]
+        if epsilon and random.random() < self.epsilon:
+            return int(random.choice(actions))
+        values = self.q[s, actions]
+        return int(random.choice(actions[values == values.max()]))
+
+    def learn(self, s, a, new_s, reward):
+        """
+        Update the Q-value of the action numbered `a` in the state
+        numbered `s`, given the resulting state number `new_s` and the
+        reward received, as update does.
+        """
+        old = self.q[s, a]
+        self.q[s, a] = old + self.alpha * (
+            reward + self.best_value(new_s) - old
+        )
+
+    def best_values(self, states):
+        """
+        Return the array of best_value for each state number in `states`.
+        """
+        values = np.max(
+            self.q[states], axis=1,
+            where=self.available[states], initial=-np.inf
+        )
+        return np.where(states == 0, 0, values)
+
+    def choose_many(self, states, rng, epsilon=True):
+        """
+        Return the array of action numbers to take in each state number
+        in `states`, each chosen as by choose, using the NumPy random
+        generator `rng`.
+        """
+        available = self.available[states]
+        values = np.where(available, self.q[states], -np.inf)
+        candidates = values == values.max(axis=1, keepdims=True)
+        if epsilon:
+            explore = rng.random(len(states)) < self.epsilon
+            candidates[explore] = available[explore]
+
+        # Pick uniformly among the candidates of each state
+        return np.argmax(rng.random(candidates.shape) * candidates, axis=1)
+
+
+def train(n, player=None, progress=1000, batch=None, workers=None,
+          sync=1000):
     """
     Train an AI by playing `n` games against itself.
+    `player` is the AI to train, a new NimAI by default.
+    Progress is printed every `progress` games, or never if `progress`
+    is None. If `batch` is set, `player` must be an ArrayNimAI, and
+    `batch` games are played at a time in lockstep. If `workers` is
+    set, `player` must be an ArrayNimAI, and games are played in that
+    many processes, whose Q-values are averaged every `sync` games each.
     """
 
-    player = NimAI()
+    if player is None:
+        player = NimAI()
+
+    if workers is not None:
+        if not isinstance(player, ArrayNimAI):
+            raise Exception("Parallel training requires an ArrayNimAI")
+        train_parallel(player, n, workers, sync, batch, progress)
+    elif batch is not None:
+        if not isinstance(player, ArrayNimAI):
+            raise Exception("Batched training requires an ArrayNimAI")
+        train_lockstep(player, n, batch, progress)
+    elif isinstance(player, ArrayNimAI):
+        train_indexed(player, n, progress)
+    else:
+        train_games(player, n, progress)
+
+    if progress is not None:
+        print("Done training")
+
+    # Return the trained AI
+    return player
+
+
+def report(played, progress):
+    """
+    Print the number of training games played, if it is a multiple
+    of `progress`.
+    """
+    if progress is not None and played % progress == 0:
+        print(f"Played {played} training games")
+
+
+def train_games(player, n, progress):
+    """
+    Train `player` by playing `n` games of Nim against itself.
+    """
 
     # Play n games
     for i in range(n):
-        print(f"Playing training game {i + 1}")
         game = Nim()
 
         # Keep track of last move made by either player
@@ -184,11 +366,12 @@ def train(n):
         }
 
         # Game loop
+        new_state = game.piles.copy()
         while True:
 
             # Keep track of current state and action
-            state = game.piles.copy()
-            action = player.choose_action(game.piles)
+            state = new_state
+            action = player.choose_action(state)
 
             # Keep track of last state and action
             last[game.player]["state"] = state
@@ -218,10 +401,199 @@ def train(n):
                     0
                 )
 
-    print("Done training")
+        report(i + 1, progress)
 
-    # Return the trained AI
-    return player
+
+def train_indexed(player, n, progress):
+    """
+    Train the ArrayNimAI `player` by playing `n` games against itself,
+    as train_games does, but moving between state and action numbers.
+    """
+    deltas = player.deltas.tolist()
+    for i in range(n):
+
+        # Last state and action numbers of each player, -1 if none
+        last_state = [-1, -1]
+        last_action = [-1, -1]
+        state = player.start
+        turn = 0
+
+        while True:
+            action = player.choose(state)
+            last_state[turn] = state
+            last_action[turn] = action
+            new_state = state - deltas[action]
+            turn = 1 - turn
+
+            # When game is over, the player who moved loses
+            if new_state == 0:
+                player.learn(state, action, new_state, -1)
+                if last_state[turn] != -1:
+                    player.learn(
+                        last_state[turn], last_action[turn], new_state, 1
+                    )
+                break
+
+            # If game is continuing, no rewards yet
+            elif last_state[turn] != -1:
+                player.learn(
+                    last_state[turn], last_action[turn], new_state, 0
+                )
+            state = new_state
+
+        report(i + 1, progress)
+
+
+def train_lockstep(player, n, batch, progress):
+    """
+    Train the ArrayNimAI `player` by playing `n` games against itself,
+    `batch` at a time, with every game making one move per step.
+    Each finished game is replaced by a new one until `n` have started.
+
+    Games in a batch that update the same Q-value in the same step
+    apply only one of their updates.
+    """
+    rng = np.random.default_rng(random.getrandbits(64))
+    size = min(batch, n)
+    started = size
+    played = 0
+
+    # State number, player to move, and each player's last state and
+    # action numbers (-1 if none) for each game in the batch
+    states = np.full(size, player.start)
+    turns = np.zeros(size, dtype=np.intp)
+    last_states = np.full((2, size), -1)
+    last_actions = np.full((2, size), -1)
+
+    while len(states):
+        games = np.arange(len(states))
+        actions = player.choose_many(states, rng)
+        last_states[turns, games] = states
+        last_actions[turns, games] = actions
+        new_states = states - player.deltas[actions]
+        turns = 1 - turns
+        over = new_states == 0
+        future = player.best_values(new_states)
+
+        # The player who moved loses if the game is over, and the
+        # player who moved before is rewarded for the move it made
+        previous = last_states[turns, games]
+        moved = previous != -1
+        targets = over.astype(float) + future
+        player.q[states[over], actions[over]] -= player.alpha * (
+            1 + player.q[states[over], actions[over]]
+        )
+        before = previous[moved], last_actions[turns, games][moved]
+        player.q[before] += player.alpha * (
+            targets[moved] - player.q[before]
+        )
+
+        # Replace finished games with new ones, or drop them
+        states = new_states
+        for _ in range(np.count_nonzero(over)):
+            played += 1
+            report(played, progress)
+        restart = over & (np.cumsum(over) <= n - started)
+        started += np.count_nonzero(restart)
+        states[restart] = player.start
+        turns[restart] = 0
+        last_states[:, restart] = -1
+        last_actions[:, restart] = -1
+        keep = ~over | restart
+        states = states[keep]
+        turns = turns[keep]
+        last_states = last_states[:, keep]
+        last_actions = last_actions[:, keep]
+
+
+# ArrayNimAI trained by this worker process, the shared memory holding
+# Q-values, and its array of the master Q-values then each task's
+worker = None
+memory = None
+tables = None
+
+
+def start_worker(initial, alpha, epsilon, name, shape):
+    """
+    Build the ArrayNimAI this worker process trains, and attach to the
+    shared memory named `name` holding an array of shape `shape`.
+    """
+    global worker, memory, tables
+    worker = ArrayNimAI(initial, alpha, epsilon)
+    memory = shared_memory.SharedMemory(name=name)
+    tables = np.ndarray(shape, buffer=memory.buf)
+
+
+def train_worker(slot, n, batch, seed):
+    """
+    Train this worker's AI on `n` games, with random seed `seed`,
+    starting from the master Q-values and leaving the result in the
+    shared array at `slot`.
+    """
+    random.seed(seed)
+    worker.q = tables[slot]
+    worker.q[:] = tables[0]
+    train(n, worker, progress=None, batch=batch)
+
+
+def train_parallel(player, n, workers, sync, batch, progress):
+    """
+    Train the ArrayNimAI `player` by playing `n` games against itself
+    across `workers` processes. In each round, every worker trains a
+    copy of the player's Q-values on `sync` games, and the player's
+    Q-values become the average of the workers'.
+
+    The Q-values are exchanged through shared memory, and each worker
+    builds its AI only once.
+    """
+    shape = (workers + 1,) + player.q.shape
+    shared = shared_memory.SharedMemory(
+        create=True, size=int(np.prod(shape)) * player.q.itemsize
+    )
+    try:
+        master = np.ndarray(shape, buffer=shared.buf)
+        master[0] = player.q
+        played = 0
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=start_worker,
+            initargs=(player.initial, player.alpha, player.epsilon,
+                      shared.name, shape)
+        ) as pool:
+            while played < n:
+
+                # Split this round's games between the workers
+                games = min(workers * sync, n - played)
+                shares = [
+                    games // workers + (1 if k < games % workers else 0)
+                    for k in range(workers)
+                ]
+                slots = [k + 1 for k, share in enumerate(shares) if share]
+                futures = [
+                    pool.submit(
+                        train_worker, slot, shares[slot - 1], batch,
+                        random.getrandbits(64)
+                    )
+                    for slot in slots
+                ]
+                for future in futures:
+                    future.result()
+
+                # Merge the workers' Q-values into the master Q-values
+                master[0] = master[slots[0]]
+                for slot in slots[1:]:
+                    master[0] += master[slot]
+                master[0] /= len(slots)
+
+                if progress is not None and (
+                        played // progress < (played + games) // progress):
+                    print(f"Played {played + games} training games")
+                played += games
+
+        player.q = master[0].copy()
+        del master
+    finally:
+        shared.close()
+        shared.unlink()
 
 
 def play(ai, human_player=None):
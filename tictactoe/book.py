@@ -0,0 +1,27 @@
+import sys
+import time
+
+import tictactoe as ttt
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) not in [2, 5, 6, 7]:
+        sys.exit("Usage: python book.py output [rows cols k [plies [seconds]]]")
+
+    # Parse command-line arguments
+    output = sys.argv[1]
+    rows, cols, k = (int(arg) for arg in sys.argv[2:5]) if len(sys.argv) >= 5 else (3, 3, 3)
+    plies = int(sys.argv[5]) if len(sys.argv) >= 6 else None
+    seconds = float(sys.argv[6]) if len(sys.argv) == 7 else None
+
+    # Solve positions and write the book
+    start = time.perf_counter()
+    count = ttt.build_book(rows, cols, k, plies=plies, time_limit=seconds)
+    ttt.save_book(output, rows, cols, k)
+    print(f"Solved {count} positions in {time.perf_counter() - start:.2f}s, saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
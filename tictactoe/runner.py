@@ -1,9 +1,15 @@
+import os
 import pygame
 import sys
 import time
 
 import tictactoe as ttt
 
+# Answer AI moves from the opening book, if one has been built
+BOOK = "book.bin"
+if os.path.exists(BOOK):
+    ttt.load_book(BOOK)
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -0,0 +1,166 @@
+import argparse
+import random
+import time
+
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import tictactoe as ttt
+
+
+def random_agent(board, rng, settings):
+    """
+    Returns a random available action.
+    """
+    return rng.choice(sorted(ttt.actions(board)))
+
+
+def minimax_agent(board, rng, settings):
+    """
+    Returns the minimax action, searched from scratch: with an empty
+    transposition table and without the opening book.
+    """
+    settings["cache"].clear()
+    return ttt.minimax(board, use_book=False, **settings)
+
+
+def cached_agent(board, rng, settings):
+    """
+    Returns the minimax action, reusing the player's transposition table
+    (and the opening book, if loaded) across moves and games.
+    """
+    return ttt.minimax(board, **settings)
+
+
+AGENTS = {
+    "random": random_agent,
+    "minimax": minimax_agent,
+    "cached": cached_agent
+}
+
+
+def play(x, o, games, seed=None, rows=3, cols=3, k=ttt.K,
+         time_limit=None, book=None):
+    """
+    Plays `games` games between the agents named `x` and `o`.
+    Each player keeps its own transposition table, so one agent clearing
+    or filling its table does not affect the other.
+    Returns (outcomes, latencies), where `outcomes` counts the winner of
+    each game (None for a tie) and `latencies` maps each player to an
+    array of the seconds each of its moves took.
+    """
+    if book is not None:
+        ttt.load_book(book)
+    rng = random.Random(seed)
+    agents = {ttt.X: AGENTS[x], ttt.O: AGENTS[o]}
+    settings = dict()
+    for player in (ttt.X, ttt.O):
+        settings[player] = {"k": k, "cache": dict()}
+        if time_limit is not None:
+            settings[player]["time_limit"] = time_limit
+    outcomes = Counter()
+    latencies = {ttt.X: array("d"), ttt.O: array("d")}
+
+    for _ in range(games):
+        board = ttt.initial_state(rows, cols)
+        while not ttt.terminal(board, k):
+            player = ttt.player(board)
+            start = time.perf_counter()
+            action = agents[player](board, rng, settings[player])
+            latencies[player].append(time.perf_counter() - start)
+            board = ttt.result(board, action)
+        outcomes[ttt.winner(board, k)] += 1
+
+    return outcomes, latencies
+
+
+def simulate(x, o, games, processes=1, seed=0, **kwargs):
+    """
+    Plays `games` games between the agents named `x` and `o`, split
+    across `processes` processes, and returns the combined results of
+    `play`.
+    """
+    if processes == 1:
+        return play(x, o, games, seed, **kwargs)
+
+    outcomes = Counter()
+    latencies = {ttt.X: array("d"), ttt.O: array("d")}
+    shares = [
+        games // processes + (1 if n < games % processes else 0)
+        for n in range(processes)
+    ]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(play, x, o, share, seed + n, **kwargs)
+            for n, share in enumerate(shares) if share
+        ]
+        for future in futures:
+            part_outcomes, part_latencies = future.result()
+            outcomes.update(part_outcomes)
+            for player in latencies:
+                latencies[player].extend(part_latencies[player])
+    return outcomes, latencies
+
+
+def percentile(values, p):
+    """
+    Returns the `p`th percentile of sorted `values`.
+    """
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description="Play many headless games between AI agents."
+    )
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("-x", choices=AGENTS, default="cached",
+                        help="agent playing X")
+    parser.add_argument("-o", choices=AGENTS, default="random",
+                        help="agent playing O")
+    parser.add_argument("-p", "--processes", type=int, default=1)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("-k", type=int, default=ttt.K,
+                        help="marks in a row needed to win")
+    parser.add_argument("-t", "--time-limit", type=float, default=None,
+                        help="seconds per minimax move")
+    parser.add_argument("-b", "--book", default=None,
+                        help="opening book to load")
+    args = parser.parse_args()
+
+    # Play games
+    start = time.perf_counter()
+    outcomes, latencies = simulate(
+        args.x, args.o, args.games, args.processes, args.seed,
+        rows=args.rows, cols=args.cols, k=args.k,
+        time_limit=args.time_limit, book=args.book
+    )
+    seconds = time.perf_counter() - start
+
+    # Report results
+    print(f"{args.games} games in {seconds:.2f}s "
+          f"({args.games / seconds:.1f} games/sec)")
+    for winner, label in [(ttt.X, "X wins"), (ttt.O, "O wins"), (None, "Ties")]:
+        print(f"{label}: {outcomes[winner]} "
+              f"({100 * outcomes[winner] / args.games:.1f}%)")
+    for player, agent in [(ttt.X, args.x), (ttt.O, args.o)]:
+        values = sorted(latencies[player])
+        print(
+            f"{player} ({agent}) move latency, ms: "
+            + ", ".join(
+                f"p{p} {1000 * percentile(values, p):.3f}"
+                for p in [50, 90, 99]
+            )
+            + f", max {1000 * (values[-1] if values else 0):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
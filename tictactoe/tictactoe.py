@@ -3,28 +3,64 @@ Tic Tac Toe Player
 """
 
 import math
-import copy 
+import struct
+import time
+
+from concurrent.futures import ProcessPoolExecutor
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Number of marks in a row needed to win, unless another is given
+K = 3
+
+# Transposition table, shared across calls and games, mapping (shape,
+# canonical board key, evaluation function) to (value, best move in the
+# canonical board's coordinates, bound, depth searched)
+table = dict()
+
+# Most entries kept in the table; the oldest are evicted first
+TABLE_LIMIT = 2 ** 20
+
+# Opening book mapping (shape, canonical board key) to the best move in
+# the canonical board's coordinates, with keys canonical under symmetry
+# as recorded in `book_symmetry` for each shape
+book = dict()
+book_symmetry = dict()
+
+# Header of a book file: magic, rows, cols, k, symmetry, entry count
+BOOK_HEADER = struct.Struct("<4s4BI")
+BOOK_MAGIC = b"TTTB"
+
+# Whether a cached value is exact, or a lower or upper bound on the value
+EXACT = "exact"
+LOWER = "lower"
+UPPER = "upper"
+
+# Whether boards equal up to rotation or reflection share table entries
+SYMMETRY = True
+
+# Largest number of cells for which symmetry tables are precomputed
+SYMMETRY_CELLS = 12
+
+# Boards with more cells than this only consider moves next to a mark
+NEAR_CELLS = 25
 
-def initial_state():
+
+def initial_state(rows=3, cols=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * cols for _ in range(rows)]
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    
-    if (9 - sum(row.count(EMPTY) for row in board)) % 2 == 0:
+
+    if sum(len(row) - row.count(EMPTY) for row in board) % 2 == 0:
         return X
     else:
         return O
@@ -35,104 +71,726 @@ def actions(board):
     Returns set of all possible actions (i, j) available on the board.
     """
     actions = set()
-    for i in range(3):
-        for j in range(3):
+    for i in range(len(board)):
+        for j in range(len(board[i])):
             if board[i][j] == EMPTY:
-                actions.add((i,j)) 
+                actions.add((i,j))
     return actions
-    
+
 
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-
-    if action not in actions(board):
-       raise Exception("Invalid action.")
-    
     i, j = action
-    if board[i][j] != EMPTY:
+    if not (0 <= i < len(board) and 0 <= j < len(board[i])) or board[i][j] != EMPTY:
         raise Exception("Invalid action.")
-    
-    new_board = copy.deepcopy(board)
+
+    new_board = [row.copy() for row in board]
     new_board[i][j] = player(board)
     return new_board
-    
 
-def winner(board):
+
+def winner(board, k=K):
     """
     Returns the winner of the game, if there is one.
     """
-    for i in range(3):
-        if board[i][0] == board[i][1] == board[i][2] and board[i][0] != EMPTY:
-            return board[i][0]
-        if board[0][i] == board[1][i] == board[2][i] and board[0][i] != EMPTY:
-            return board[0][i]
-    if (board[0][0] == board[1][1] == board[2][2] or board[0][2] == board[1][1] == board[2][0]) and board[1][1] != EMPTY:
-        return board[1][1]
-    return None
+    return Bitboard.from_list(board, k).winner()
 
 
-def terminal(board):
+def terminal(board, k=K):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) is not None or sum(row.count(EMPTY) for row in board) == 0:
+    if winner(board, k) is not None or sum(row.count(EMPTY) for row in board) == 0:
         return True
     return False
 
 
-def utility(board):
+def utility(board, k=K):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) == X:
+    w = winner(board, k)
+    if w == X:
         return 1
-    if winner(board) == O:
+    if w == O:
         return -1
     return 0
 
 
-def minimax(board):
+class Layout():
+    """
+    Precomputed tables for boards of `rows` by `cols` cells on which
+    `k` marks in a row win. On a bitboard, cell (i, j) is bit i * cols + j.
+    """
+
+    # Layouts already built, by shape
+    layouts = dict()
+
+    @classmethod
+    def get(cls, rows=3, cols=3, k=K):
+        """
+        Returns the layout for a shape, building it only once.
+        """
+        shape = (rows, cols, k)
+        if shape not in cls.layouts:
+            cls.layouts[shape] = cls(rows, cols, k)
+        return cls.layouts[shape]
+
+    def __init__(self, rows, cols, k):
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.shape = (rows, cols, k)
+        self.cells = [(i, j) for i in range(rows) for j in range(cols)]
+        self.full = (1 << len(self.cells)) - 1
+
+        # Bitmasks of every k cells in a row, column or diagonal, and
+        # for each cell, the bitmasks of those that pass through it
+        self.win_masks = []
+        for i, j in self.cells:
+            for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                line = [(i + s * di, j + s * dj) for s in range(k)]
+                if all(0 <= a < rows and 0 <= b < cols for a, b in line):
+                    self.win_masks.append(
+                        sum(1 << (a * cols + b) for a, b in line)
+                    )
+        self.lines = [
+            [mask for mask in self.win_masks if mask >> c & 1]
+            for c in range(len(self.cells))
+        ]
+
+        # Search order: cells on the most lines first, then nearest
+        # the center (on 3x3: center, then corners, then edges)
+        self.order = sorted(
+            range(len(self.cells)),
+            key=lambda c: (
+                -len(self.lines[c]),
+                abs(2 * self.cells[c][0] - rows + 1)
+                + abs(2 * self.cells[c][1] - cols + 1)
+            )
+        )
+
+        # For each cell, the bitmask of cells next to it
+        self.near = [
+            sum(
+                1 << (a * cols + b)
+                for a in range(i - 1, i + 2) for b in range(j - 1, j + 2)
+                if 0 <= a < rows and 0 <= b < cols
+            )
+            for i, j in self.cells
+        ]
+
+        # Each symmetry of the board as a permutation of cell indices, its
+        # inverse, and the image of every possible bitmask under it
+        symmetries = [
+            lambda i, j: (i, j),
+            lambda i, j: (rows - 1 - i, cols - 1 - j),
+            lambda i, j: (i, cols - 1 - j),
+            lambda i, j: (rows - 1 - i, j)
+        ]
+        if rows == cols:
+            symmetries += [
+                lambda i, j: (j, rows - 1 - i),
+                lambda i, j: (cols - 1 - j, i),
+                lambda i, j: (j, i),
+                lambda i, j: (cols - 1 - j, rows - 1 - i)
+            ]
+        if len(self.cells) > SYMMETRY_CELLS:
+            symmetries = symmetries[:1]
+        self.permutations = [
+            [a * cols + b for a, b in (symmetry(i, j) for i, j in self.cells)]
+            for symmetry in symmetries
+        ]
+        self.inverses = [
+            [permutation.index(c) for c in range(len(self.cells))]
+            for permutation in self.permutations
+        ]
+        self.images = [
+            [
+                sum(
+                    1 << permutation[c]
+                    for c in range(len(self.cells)) if mask >> c & 1
+                )
+                for mask in range(self.full + 1)
+            ]
+            for permutation in self.permutations[1:]
+        ]
+
+
+class Bitboard():
     """
-    Returns the optimal action for the current player on the board.
+    Compact board state: `x` and `o` are bitmasks of the cells
+    each player has marked, and `history` is the list of cells marked
+    since the bitboard was created.
     """
-    if terminal(board):
+
+    def __init__(self, x=0, o=0, layout=None):
+        self.x = x
+        self.o = o
+        self.layout = layout or Layout.get()
+        self.history = []
+
+    @classmethod
+    def from_list(cls, board, k=K):
+        """
+        Returns the bitboard for a board in list format.
+        """
+        layout = Layout.get(len(board), len(board[0]), k)
+        x = o = 0
+        for c, (i, j) in enumerate(layout.cells):
+            if board[i][j] == X:
+                x |= 1 << c
+            elif board[i][j] == O:
+                o |= 1 << c
+        return cls(x, o, layout)
+
+    def to_list(self):
+        """
+        Returns the board in list format.
+        """
+        board = initial_state(self.layout.rows, self.layout.cols)
+        for c, (i, j) in enumerate(self.layout.cells):
+            if self.x >> c & 1:
+                board[i][j] = X
+            elif self.o >> c & 1:
+                board[i][j] = O
+        return board
+
+    def x_to_move(self):
+        """
+        Returns True if it is X's turn.
+        """
+        return (self.x | self.o).bit_count() % 2 == 0
+
+    def actions(self):
+        """
+        Returns list of the indices of empty cells, in search order.
+        On boards of more than NEAR_CELLS cells, only cells next to a
+        mark are included (or the first cell in order, on an empty board).
+        """
+        layout = self.layout
+        marked = self.x | self.o
+        empty = ~marked
+        if len(layout.cells) > NEAR_CELLS:
+            if not marked:
+                return layout.order[:1]
+            near = 0
+            for c in range(len(layout.cells)):
+                if marked >> c & 1:
+                    near |= layout.near[c]
+            empty &= near
+        return [c for c in layout.order if empty >> c & 1]
+
+    def make(self, c):
+        """
+        Marks cell `c` for the player to move.
+        """
+        if self.x_to_move():
+            self.x |= 1 << c
+        else:
+            self.o |= 1 << c
+        self.history.append(c)
+
+    def unmake(self, c):
+        """
+        Clears cell `c`, undoing the move that marked it.
+        """
+        self.x &= ~(1 << c)
+        self.o &= ~(1 << c)
+        self.history.pop()
+
+    def winner(self):
+        """
+        Returns the winner of the game, if there is one.
+        After a move, only lines through that move are checked.
+        """
+        if self.history:
+            c = self.history[-1]
+            marks, mark = (self.x, X) if self.x >> c & 1 else (self.o, O)
+            for mask in self.layout.lines[c]:
+                if marks & mask == mask:
+                    return mark
+            return None
+        for mask in self.layout.win_masks:
+            if self.x & mask == mask:
+                return X
+            if self.o & mask == mask:
+                return O
         return None
-    
-    next_player = player(board)
-    if next_player == X:
-        return max_value(board)[1]
-    else:
-        return min_value(board)[1]
-    
-
-def max_value(board):
-    best_move = None
-    if terminal(board):
-        return utility(board), best_move
-    
-    max = float('-inf')
-    for action in actions(board):
-        v, _ = min_value(result(board, action))
-        if v > max:
-            max = v
-            best_move = action
-
-    return max, best_move
-
-
-def min_value(board):
-    best_move = None
-    if terminal(board):
-        return utility(board), best_move
-    
-    min = float('inf')
-    for action in actions(board):
-        v, _ = max_value(result(board, action))
-        if v < min:
-            min = v
-            best_move = action
-
-    return min, best_move
 
+    def utility(self):
+        """
+        Returns (terminal, utility): whether the game is over and, if so,
+        1 if X has won, -1 if O has won, 0 otherwise.
+        """
+        w = self.winner()
+        if w is not None:
+            return True, 1 if w == X else -1
+        return (self.x | self.o) == self.layout.full, 0
+
+
+def canonical(board, symmetric=None):
+    """
+    Returns (key, symmetry) where `key` encodes the bitboard as an integer
+    and `symmetry` is the index of the permutation mapping the board onto
+    the position that `key` encodes. If `symmetric` (by default,
+    SYMMETRY), the key is the least among all symmetric boards.
+    """
+    if symmetric is None:
+        symmetric = SYMMETRY
+    shift = len(board.layout.cells)
+    best = (board.x | board.o << shift, 0)
+    if symmetric:
+        for symmetry, images in enumerate(board.layout.images, 1):
+            key = images[board.x] | images[board.o] << shift
+            if key < best[0]:
+                best = (key, symmetry)
+    return best
+
+
+def lookup(board, evaluate=None, cache=None):
+    """
+    Returns the cached (value, best move, bound, depth) for the board,
+    as searched scoring positions at the depth limit with `evaluate`
+    (by default, heuristic), or None. `cache` is the transposition table
+    to look in (by default, `table`).
+    """
+    if cache is None:
+        cache = table
+    key, symmetry = canonical(board)
+    entry = cache.get((board.layout.shape, key, evaluate or heuristic))
+    if entry is None:
+        return None
+    value, move, bound, depth = entry
+    if move is not None:
+        move = board.layout.inverses[symmetry][move]
+    return value, move, bound, depth
+
+
+def store(board, value, move, bound=None, depth=math.inf, evaluate=None,
+          cache=None):
+    """
+    Caches the value and best move for the board, where `bound` is EXACT,
+    or LOWER or UPPER if the search was cut off and `value` only bounds
+    the true value from below or above, `depth` is how many moves ahead
+    the board was searched, and `evaluate` (by default, heuristic) scored
+    positions at the depth limit, in the transposition table `cache` (by
+    default, `table`). Evicts the oldest entry if the table is full.
+    """
+    if cache is None:
+        cache = table
+    key, symmetry = canonical(board)
+    if move is not None:
+        move = board.layout.permutations[symmetry][move]
+    entry = (board.layout.shape, key, evaluate or heuristic)
+    if entry not in cache and len(cache) >= TABLE_LIMIT:
+        del cache[next(iter(cache))]
+    cache[entry] = (value, move, bound or EXACT, depth)
+
+
+def book_move(board):
+    """
+    Returns the opening book's move for the bitboard, or None.
+    """
+    shape = board.layout.shape
+    if shape not in book_symmetry:
+        return None
+    key, symmetry = canonical(board, book_symmetry[shape])
+    move = book.get((shape, key))
+    if move is None:
+        return None
+    return board.layout.inverses[symmetry][move]
+
+
+def build_book(rows=3, cols=3, k=K, plies=None, time_limit=None):
+    """
+    Solves every position reachable within `plies` moves of the start
+    (every reachable position, by default), each with at most about
+    `time_limit` seconds of search if given, and adds their best moves
+    to the opening book. Returns the number of positions added.
+    """
+    board = Bitboard(layout=Layout.get(rows, cols, k))
+    shape = board.layout.shape
+    book_symmetry[shape] = SYMMETRY
+    added = 0
+    seen = set()
+    stack = [[]]
+    while stack:
+        moves = stack.pop()
+        for move in moves:
+            board.make(move)
+        key, symmetry = canonical(board)
+        if key not in seen and not board.utility()[0]:
+            seen.add(key)
+            if time_limit is None:
+                move = Search().root(board)[1]
+            else:
+                action = minimax(board.to_list(), k=k, time_limit=time_limit)
+                move = board.layout.cells.index(action)
+            book[shape, key] = board.layout.permutations[symmetry][move]
+            added += 1
+            if plies is None or len(moves) < plies:
+                for action in board.actions():
+                    stack.append(moves + [action])
+        for move in reversed(moves):
+            board.unmake(move)
+    return added
+
+
+def save_book(filename, rows=3, cols=3, k=K):
+    """
+    Writes the opening book for a shape to a file: a header, then each
+    canonical board key and its best move, in order of key.
+    """
+    shape = (rows, cols, k)
+    cells = rows * cols
+    key_size = (2 * cells + 7) // 8
+    move_size = (cells.bit_length() + 7) // 8
+    entries = sorted(
+        (key, move) for (s, key), move in book.items() if s == shape
+    )
+    with open(filename, "wb") as f:
+        f.write(BOOK_HEADER.pack(
+            BOOK_MAGIC, rows, cols, k,
+            book_symmetry.get(shape, SYMMETRY), len(entries)
+        ))
+        for key, move in entries:
+            f.write(key.to_bytes(key_size, "little"))
+            f.write(move.to_bytes(move_size, "little"))
+
+
+def load_book(filename):
+    """
+    Adds the positions in an opening book file to the opening book,
+    so that minimax answers them without searching.
+    """
+    with open(filename, "rb") as f:
+        contents = f.read()
+    magic, rows, cols, k, symmetric, count = BOOK_HEADER.unpack_from(contents)
+    if magic != BOOK_MAGIC:
+        raise Exception("Invalid opening book.")
+    shape = (rows, cols, k)
+    cells = rows * cols
+    key_size = (2 * cells + 7) // 8
+    move_size = (cells.bit_length() + 7) // 8
+    book_symmetry[shape] = bool(symmetric)
+    offset = BOOK_HEADER.size
+    for _ in range(count):
+        key = int.from_bytes(contents[offset:offset + key_size], "little")
+        offset += key_size
+        move = int.from_bytes(contents[offset:offset + move_size], "little")
+        offset += move_size
+        book[shape, key] = move
+
+
+def ordered_actions(board, first=None):
+    """
+    Returns the bitboard's actions in search order, with the action
+    `first` (e.g. a cached best move) ahead of all others.
+    """
+    actions = board.actions()
+    if first in actions:
+        actions.remove(first)
+        actions.insert(0, first)
+    return actions
+
+
+def heuristic(board):
+    """
+    Returns an estimate, strictly between -1 and 1, of the value of a
+    non-terminal bitboard: every line that only one player has marked
+    counts for that player, more so the more marks it has.
+    """
+    score = 0
+    for mask in board.layout.win_masks:
+        x = (board.x & mask).bit_count()
+        o = (board.o & mask).bit_count()
+        if x and not o:
+            score += 4 ** x
+        elif o and not x:
+            score -= 4 ** o
+    return score / (abs(score) + 1)
+
+
+class Timeout(Exception):
+    """
+    Raised when a search runs past its deadline.
+    """
+
+
+class Search():
+    """
+    Alpha-beta search, optionally limited in depth (scoring positions at
+    the depth limit with `evaluate`) and in time (raising Timeout once
+    `time.perf_counter()` passes `deadline`), caching values in the
+    transposition table `cache` (by default, `table`).
+    """
+
+    def __init__(self, prune=True, evaluate=heuristic, deadline=None,
+                 cache=None):
+        self.prune = prune
+        self.evaluate = evaluate
+        self.deadline = deadline
+        self.cache = cache
+
+    def root(self, board, depth=math.inf):
+        """
+        Returns (value, best move) for the bitboard searched `depth` moves
+        ahead. If the search times out, the bitboard is left unchanged.
+        """
+        x, o, history = board.x, board.o, board.history.copy()
+        try:
+            if board.x_to_move():
+                return self.max_value(board, -math.inf, math.inf, depth)
+            return self.min_value(board, -math.inf, math.inf, depth)
+        except Timeout:
+            board.x, board.o, board.history = x, o, history
+            raise
+
+    def cached_value(self, board, alpha, beta, depth):
+        """
+        Returns (value, best move, usable) from the table for the board,
+        where `usable` is True if the value can be returned as is for an
+        (alpha, beta) search window `depth` moves deep.
+        """
+        cached = lookup(board, self.evaluate, self.cache)
+        if cached is None:
+            return None, None, False
+        value, move, bound, searched = cached
+        usable = searched >= depth and (
+            bound == EXACT
+            or (bound == LOWER and value >= beta)
+            or (bound == UPPER and value <= alpha)
+        )
+        return value, move, usable
+
+    def max_value(self, board, alpha, beta, depth):
+        return self.value(board, alpha, beta, depth, True)
+
+    def min_value(self, board, alpha, beta, depth):
+        return self.value(board, alpha, beta, depth, False)
+
+    def value(self, board, alpha, beta, depth, maximizing):
+        best_move = None
+        over, value = board.utility()
+        if over:
+            return value, best_move
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise Timeout
+
+        # Searching past the last empty cell is searching to the end
+        depth = min(depth, len(board.layout.cells) - (board.x | board.o).bit_count())
+        if depth == 0:
+            return self.evaluate(board), best_move
+
+        value, move, usable = self.cached_value(board, alpha, beta, depth)
+        if usable:
+            return value, move
+
+        window = (alpha, beta)
+        best = -math.inf if maximizing else math.inf
+        for action in ordered_actions(board, move):
+            board.make(action)
+            v, _ = self.value(board, alpha, beta, depth - 1, not maximizing)
+            board.unmake(action)
+            if (v > best) if maximizing else (v < best):
+                best = v
+                best_move = action
+            if self.prune:
+                if maximizing:
+                    if best >= beta:
+                        break
+                    alpha = max(alpha, best)
+                else:
+                    if best <= alpha:
+                        break
+                    beta = min(beta, best)
+
+        store(board, best, best_move, bound(best, *window), depth,
+              self.evaluate, self.cache)
+        return best, best_move
+
+
+def minimax(board, prune=True, k=K, depth=None, time_limit=None,
+            evaluate=heuristic, use_book=True, cache=None):
+    """
+    Returns the optimal action for the current player on the board,
+    from the opening book if it has the position and `use_book` is True.
+    Searches with the transposition table `cache` (by default, `table`).
+    If `prune` is True, uses alpha-beta pruning.
+
+    With neither `depth` nor `time_limit`, searches to the end of the game.
+    Otherwise uses iterative deepening, up to `depth` moves ahead and for
+    at most about `time_limit` seconds, scoring positions at the depth
+    limit with `evaluate` and returning the best action found by the
+    deepest search that finished.
+    """
+    board = Bitboard.from_list(board, k)
+    if board.utility()[0]:
+        return None
+
+    move = book_move(board) if use_book else None
+    if move is not None:
+        return board.layout.cells[move]
+
+    if depth is None and time_limit is None:
+        search = Search(prune, cache=cache)
+        return board.layout.cells[search.root(board)[1]]
+
+    deadline = None
+    if time_limit is not None:
+        deadline = time.perf_counter() + time_limit
+    search = Search(prune, evaluate, deadline, cache)
+    empty = len(board.layout.cells) - (board.x | board.o).bit_count()
+    limit = min(depth if depth is not None else empty, empty)
+    best_move = board.actions()[0]
+    for d in range(1, limit + 1):
+        try:
+            best_move = search.root(board, d)[1]
+        except Timeout:
+            break
+    return board.layout.cells[best_move]
+
+
+def child_value(x, o, shape, move, depth, time_left, sent, prune,
+                evaluate):
+    """
+    Returns (move, value) for the position after `move` on the bitboard
+    (x, o) of a shape, searched `depth` moves ahead, or (move, None) if
+    the search ran past `time_left` seconds after the task was `sent`,
+    a time.time() timestamp.
+    """
+    # Only time spent waiting is measured with the clock shared between
+    # processes; the search itself is timed with this process's clock
+    deadline = None
+    if time_left is not None:
+        waited = max(time.time() - sent, 0)
+        deadline = time.perf_counter() + time_left - waited
+    board = Bitboard(x, o, Layout.get(*shape))
+    board.make(move)
+    try:
+        return move, Search(prune, evaluate, deadline).root(board, depth)[0]
+    except Timeout:
+        return move, None
+
+
+def parallel_minimax(board, prune=True, k=K, depth=None, time_limit=None,
+                     evaluate=heuristic, use_book=True, pool=None,
+                     workers=None):
+    """
+    Returns the same action as minimax, but searches the position after
+    each root action in parallel on `pool`, a ProcessPoolExecutor (or on
+    a new pool of `workers` processes). Each process keeps its own
+    transposition table, so reusing a pool across moves and games
+    reuses what it has already searched.
+    """
+    board = Bitboard.from_list(board, k)
+    if board.utility()[0]:
+        return None
+
+    move = book_move(board) if use_book else None
+    if move is not None:
+        return board.layout.cells[move]
+
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return parallel_minimax(
+                board.to_list(), prune, k, depth, time_limit, evaluate,
+                use_book, pool
+            )
+
+    # Actions in the order the sequential search would try them
+    cached = lookup(board, evaluate)
+    actions = ordered_actions(board, cached[1] if cached else None)
+    maximizing = board.x_to_move()
+
+    def best(values):
+        best_move = None
+        for action in actions:
+            v = values[action]
+            if best_move is None or (
+                v > values[best_move] if maximizing else v < values[best_move]
+            ):
+                best_move = action
+        return best_move
+
+    # Without limits, search every root action to the end of the game
+    if depth is None and time_limit is None:
+        values = dict(pool.map(
+            child_value,
+            *zip(*[
+                (board.x, board.o, board.layout.shape, action,
+                 math.inf, None, None, prune, evaluate)
+                for action in actions
+            ])
+        ))
+        return board.layout.cells[best(values)]
+
+    # Otherwise deepen until the deadline, keeping the deepest results
+    # for which every root action finished
+    deadline = None
+    if time_limit is not None:
+        deadline = time.perf_counter() + time_limit
+    empty = len(board.layout.cells) - (board.x | board.o).bit_count()
+    limit = min(depth if depth is not None else empty, empty)
+    best_move = actions[0]
+    for d in range(1, limit + 1):
+
+        # Workers time themselves, since perf_counter is only comparable
+        # within one process
+        time_left = None
+        if deadline is not None:
+            time_left = deadline - time.perf_counter()
+        sent = time.time()
+        values = dict(pool.map(
+            child_value,
+            *zip(*[
+                (board.x, board.o, board.layout.shape, action,
+                 d - 1, time_left, sent, prune, evaluate)
+                for action in actions
+            ])
+        ))
+        if None in values.values():
+            break
+        best_move = best(values)
+    return board.layout.cells[best_move]
+
+
+def bound(value, alpha, beta):
+    """
+    Returns whether a value found within an (alpha, beta) window is
+    EXACT, or only a LOWER or UPPER bound on the true value.
+    """
+    if value <= alpha:
+        return UPPER
+    if value >= beta:
+        return LOWER
+    return EXACT
+
+
+def max_value(board, alpha=-math.inf, beta=math.inf, prune=True, k=K):
+    """
+    Returns (value, best action) for X on the board, searched to the end.
+    """
+    return list_value(board, alpha, beta, prune, k, True)
+
+
+def min_value(board, alpha=-math.inf, beta=math.inf, prune=True, k=K):
+    """
+    Returns (value, best action) for O on the board, searched to the end.
+    """
+    return list_value(board, alpha, beta, prune, k, False)
+
+
+def list_value(board, alpha, beta, prune, k, maximizing):
+    """
+    Runs Search.value on the bitboard for a list board, and maps the best
+    move back to an (i, j) action.
+    """
+    board = Bitboard.from_list(board, k)
+    value, move = Search(prune).value(board, alpha, beta, math.inf, maximizing)
+    if move is not None:
+        move = board.layout.cells[move]
+    return value, move